@@ -22,7 +22,8 @@ def main():
         print("1. 🛠️  INGESTION: Process PDF and create Vector Database")
         print("2. 📊 EVALUATION: Run Master Benchmark (RAGAS + Llama 3.1)")
         print("3. 💬 CHAT: Launch User Interface (Streamlit)")
-        print("4. 🚪 Exit")
+        print("4. 🗜️  COMPRESSION: Benchmark Context Compression Ratios")
+        print("5. 🚪 Exit")
         print("-" * 65)
         
         opcion = input("Please select an option: ")
@@ -50,6 +51,13 @@ def main():
                 pass
                 
         elif opcion == "4":
+            print("\n[INFO] Starting Context Compression Benchmark (Tokens vs Latency vs Faithfulness)...")
+            evaluator = RAGEvaluator()
+            # Compara la línea base contra distintos ratios de compresión extractiva
+            evaluator.run_compression_benchmark()
+            input("\nPress Enter to return to the menu...")
+            
+        elif opcion == "5":
             print("Closing AI System. Goodbye!")
             break
         else:
@@ -32,6 +32,14 @@ class Config:
     CHUNK_OVERLAP = 150
     DEVICE = 'cuda' if torch.cuda.is_available() else 'cpu'
 
+    # --- COMPRESIÓN EXTRACTIVA DE CONTEXTO ---
+    # Etapa opcional entre el Re-ranking y la Generación: conserva solo las oraciones
+    # más relevantes para reducir el costo de evaluación del prompt en Ollama (CPU).
+    CONTEXT_COMPRESSION = False
+    COMPRESSION_KEEP_RATIO = 0.5      # Fracción de oraciones conservadas
+    COMPRESSION_MIN_SENTENCES = 3     # Piso para preguntas con contexto muy corto
+    COMPRESSION_REPORT = os.path.join(REPORTS_DIR, "compression_benchmark.csv")
+
     @classmethod
     def init_workspace(cls):
         """Crea la estructura de carpetas necesaria para el proyecto."""
@@ -142,6 +142,90 @@ class RAGEvaluator:
         df.to_csv(Config.MASTER_REPORT, index=False)
         self._show_report(df)
 
+    def run_compression_benchmark(self, keep_ratios=(None, 0.7, 0.5, 0.3)):
+        """
+        Barre distintos ratios de compresión extractiva sobre el Ground Truth y reporta,
+        por ratio, los tokens reales del prompt (Ollama), la latencia y la fidelidad.
+        None representa la línea base sin compresión. Las consultas rechazadas por el umbral
+        del Re-ranker se contabilizan aparte y se excluyen de todos los promedios.
+        """
+        print(f"Iniciando Benchmark de Compresión (Ratios: {list(keep_ratios)})")
+        
+        if not os.path.exists(Config.GT_PATH):
+            print(f"Error: Ground Truth no encontrado.")
+            return
+
+        with open(Config.GT_PATH, 'r', encoding='utf-8') as f:
+            gt_data = json.load(f)
+
+        if not gt_data:
+            print(f"Error: Ground Truth vacío.")
+            return
+
+        # Los modelos se cargan una sola vez; solo se modifica el ratio entre corridas
+        rag = RAGSystem()
+        rows = []
+        
+        # Consulta de calentamiento descartada: absorbe el cold start de Ollama (carga del modelo)
+        # para que no se imputen a la línea base las latencias de la primera corrida
+        rag.keep_ratio = None
+        rag.query(gt_data[0]['question'])
+        
+        for ratio in keep_ratios:
+            rag.keep_ratio = ratio
+            samples, stats = [], []
+            refusals = 0
+            label = "off" if ratio is None else ratio
+            
+            for item in tqdm(gt_data, desc=f"Compresión {label}", unit="preg"):
+                res = rag.query(item['question'])
+                if res["metrics"]["refused"]:
+                    refusals += 1
+                    continue
+                stats.append(res["metrics"])
+                samples.append({
+                    "user_input": item['question'],
+                    "response": sanitize_for_eval(res["answer"]),
+                    # El Juez evalúa contra el texto completo que leyó el LLM, no contra los snippets de UI
+                    "retrieved_contexts": res["full_contexts"],
+                    "reference": sanitize_for_eval(item['ground_truth'])
+                })
+
+            faithfulness = float("nan")
+            if samples:
+                results = evaluate(
+                    dataset=EvaluationDataset.from_list(samples), 
+                    metrics=[Faithfulness(llm=self.llm_judge)], 
+                    run_config=RunConfig(max_workers=1, timeout=300)
+                )
+                faithfulness = results.to_pandas()["faithfulness"].mean(skipna=True)
+            
+            stats_df = pd.DataFrame(stats, columns=["prompt_tokens", "context_reduction", "prompt_eval_latency",
+                                                    "generation_latency", "total_latency"])
+            rows.append({
+                "keep_ratio": label,
+                "answered": len(samples),
+                "refusals": refusals,
+                "prompt_tokens": stats_df["prompt_tokens"].mean(),
+                "context_reduction": stats_df["context_reduction"].mean(),
+                "prompt_eval_latency": stats_df["prompt_eval_latency"].mean(),
+                "generation_latency": stats_df["generation_latency"].mean(),
+                "total_latency": stats_df["total_latency"].mean(),
+                "faithfulness": faithfulness
+            })
+
+        df = pd.DataFrame(rows)
+        # Reducción real de tokens: cada ratio contra la línea base medida por Ollama
+        baseline = df.loc[df["keep_ratio"] == "off", "prompt_tokens"]
+        df["token_reduction"] = 1 - df["prompt_tokens"] / baseline.iloc[0] if not baseline.empty else float("nan")
+        df.to_csv(Config.COMPRESSION_REPORT, index=False)
+        
+        print(f"\n{'='*65}")
+        print(f"🗜️  REPORTE DE COMPRESIÓN DE CONTEXTO")
+        print(f"{'='*65}")
+        print(tabulate(df, headers='keys', tablefmt='psql', showindex=False, floatfmt=".3f"))
+        print(f"\nReporte guardado en: {Config.COMPRESSION_REPORT}")
+
     def _show_report(self, df):
         cols = ['faithfulness', 'answer_relevancy', 'context_precision', 'context_recall']
         avg = df[cols].mean(skipna=True).to_frame().T
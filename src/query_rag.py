@@ -1,14 +1,23 @@
 import json
+import math
 import os
+import re
+import time
 from datetime import datetime
 from sentence_transformers import CrossEncoder
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
 from langchain_ollama import OllamaLLM
 from src.config import Config
 
+# Abreviaturas frecuentes en ISL que no marcan fin de oración ("e.g.", "Fig. 3.1", "Eq. 2.7")
+ABBREVIATIONS = {"e.g.", "i.e.", "etc.", "vs.", "cf.", "al.", "approx.", "resp.",
+                 "fig.", "figs.", "eq.", "eqs.", "sec.", "secs.", "ch.", "no."}
+# Fin de oración: puntuación seguida de espacio y de una mayúscula o marcador de Markdown/LaTeX
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z(\[$*_#\\])')
+
 class RAGSystem:
     def __init__(self):
         # 1. Configuración de Componentes de Recuperación
@@ -24,6 +33,10 @@ class RAGSystem:
         # El Cross-Encoder actúa como el filtro de calidad semántica definitivo
         self.reranker = CrossEncoder(Config.RERANK_MODEL, device=Config.DEVICE)
         
+        # Compresión extractiva opcional (None = desactivada). Se expone como atributo
+        # para que el evaluador pueda barrer distintos ratios sin recargar los modelos.
+        self.keep_ratio = Config.COMPRESSION_KEEP_RATIO if Config.CONTEXT_COMPRESSION else None
+        
         # 2. Motor de Inferencia (Configurado con Temperatura 0 para fidelidad técnica)
         self.llm = OllamaLLM(model=Config.RAG_LLM, temperature=0)
         
@@ -60,12 +73,15 @@ class RAGSystem:
             Technical Response:"""
         
         self.prompt = ChatPromptTemplate.from_template(template)
-        self.chain = self.prompt | self.llm | StrOutputParser()
 
     def query(self, query):
         """
-        Ejecuta el pipeline RAG optimizado: Recuperación -> Re-ranking -> Generación Jerárquica.
+        Ejecuta el pipeline RAG optimizado: Recuperación -> Re-ranking -> [Compresión] -> Generación Jerárquica.
+        Los tokens del prompt y su tiempo de evaluación son los que reporta Ollama
+        (prompt_eval_count / prompt_eval_duration), no una aproximación local.
         """
+        start = time.perf_counter()
+        
         # A. Recuperación Vectorial Inicial (Fase 1: K=15 para amplitud semántica)
         initial_docs = self.vectorstore.similarity_search(query, k=15)
         
@@ -82,14 +98,68 @@ class RAGSystem:
                       if d.metadata["score"] > -3.5][:5]
 
         if not final_docs:
+            # Rechazo temprano: no hay llamada al LLM, pero se reporta para que el benchmark lo contabilice
             return {
                 "answer": "I apologize, but the requested information is not available in the retrieved fragments of the book.", 
-                "contexts": []
+                "contexts": [],
+                "full_contexts": [],
+                "metrics": {
+                    "keep_ratio": self.keep_ratio,
+                    "refused": True,
+                    "total_latency": time.perf_counter() - start
+                }
             }
 
-        # C. Construcción del Contexto con Jerarquía Completa (XML Enriquecido)
+        # C. Compresión Extractiva Opcional (Fase 3: Poda a nivel de oración)
+        reranked_docs = final_docs
+        if self.keep_ratio is not None:
+            final_docs = self._compress(query, final_docs, self.keep_ratio)
+
+        # D. Construcción del Contexto con Jerarquía Completa (XML Enriquecido)
         # Se inyecta la traza completa: Página, Capítulo, Subcapítulo y Sección.
-        context_str = "\n".join([
+        context_str = self._build_context(final_docs)
+
+        # E. Generación de Respuesta Controlada
+        # Se usa generate() en lugar de una cadena LCEL para acceder a la telemetría de Ollama
+        prompt_str = self.prompt.format_prompt(context=context_str, question=query).to_string()
+        gen_start = time.perf_counter()
+        generation = self.llm.generate([prompt_str]).generations[0][0]
+        end = time.perf_counter()
+        response = generation.text
+        info = generation.generation_info or {}
+        
+        # La reducción se mide en caracteres (exacta y sin tokenizador); los tokens reales
+        # solo existen para el prompt enviado, por lo que la reducción en tokens se obtiene
+        # en el benchmark comparando contra la corrida sin compresión.
+        original_chars = sum(len(d.page_content) for d in reranked_docs)
+        context_chars = sum(len(d.page_content) for d in final_docs)
+        
+        metrics = {
+            "keep_ratio": self.keep_ratio,
+            "refused": False,
+            "context_chars_original": original_chars,
+            "context_chars": context_chars,
+            "context_reduction": 1 - context_chars / original_chars if original_chars else 0.0,
+            "prompt_tokens": info.get("prompt_eval_count"),
+            "prompt_eval_latency": info["prompt_eval_duration"] / 1e9 if info.get("prompt_eval_duration") else None,
+            "generation_latency": end - gen_start,
+            "total_latency": end - start
+        }
+        
+        # F. Registro de Auditoría para RAGAS
+        self._log(query, response, final_docs, metrics)
+        
+        return {
+            "answer": response,
+            "contexts": [f"Pag {d.metadata.get('physical_page', d.metadata.get('page', 'N/A'))}: {d.page_content[:200]}..." for d in final_docs],
+            "full_contexts": [d.page_content for d in final_docs],
+            "metrics": metrics
+        }
+
+    @staticmethod
+    def _build_context(docs):
+        """Serializa los fragmentos en XML con la traza completa: Página, Capítulo, Subcapítulo y Sección."""
+        return "\n".join([
             f"<DOCUMENT "
             f"page='{d.metadata.get('physical_page', d.metadata.get('page', 'N/A'))}' "
             f"chapter='{d.metadata.get('chapter', 'N/A')}' "
@@ -97,27 +167,65 @@ class RAGSystem:
             f"section='{d.metadata.get('section', 'N/A')}'>\n"
             f"{d.page_content}\n"
             f"</DOCUMENT>" 
-            for d in final_docs
+            for d in docs
         ])
 
-        # D. Generación de Respuesta Controlada
-        response = self.chain.invoke({"context": context_str, "question": query})
-        
-        # E. Registro de Auditoría para RAGAS
-        self._log(query, response, final_docs)
+    @staticmethod
+    def _split_sentences(text):
+        """
+        Divide un fragmento en oraciones (fin de oración o salto de párrafo) sin romper bloques $$...$$
+        ni cortar tras abreviaturas como "(e.g." o "Fig.", ni tras iniciales ("T. Hastie").
+        """
+        blocks = re.split(r'(\$\$.*?\$\$)', text, flags=re.DOTALL)
+        sentences = []
+        for block in blocks:
+            if block.startswith('$$'):
+                sentences.append(block)
+                continue
+            for paragraph in re.split(r'\n{2,}', block):
+                merged = []
+                for piece in SENTENCE_END.split(paragraph):
+                    last_word = merged[-1].split()[-1].lstrip("([") if merged and merged[-1].split() else ""
+                    if last_word.lower() in ABBREVIATIONS or re.fullmatch(r'[A-Z]\.', last_word):
+                        merged[-1] = f"{merged[-1]} {piece}"
+                    else:
+                        merged.append(piece)
+                sentences.extend(merged)
+        return [s.strip() for s in sentences if s and s.strip()]
+
+    def _compress(self, query, docs, keep_ratio):
+        """
+        Compresión extractiva: puntúa todas las oraciones contra la consulta en un único
+        batch del Cross-Encoder y conserva las mejores en su orden original. Cada fragmento
+        mantiene sus metadatos (página, sección) para preservar las citaciones [Page X].
+        """
+        split_docs = [self._split_sentences(d.page_content) for d in docs]
+        index = [(i, j) for i, sents in enumerate(split_docs) for j in range(len(sents))]
+        if not index:
+            return docs
+
+        scores = self.reranker.predict([[query, split_docs[i][j]] for i, j in index])
         
-        return {
-            "answer": response,
-            "contexts": [f"Pag {d.metadata.get('physical_page', d.metadata.get('page', 'N/A'))}: {d.page_content[:200]}..." for d in final_docs]
-        }
+        n_keep = max(Config.COMPRESSION_MIN_SENTENCES, math.ceil(len(index) * keep_ratio))
+        ranked = sorted(range(len(index)), key=lambda k: scores[k], reverse=True)
+        kept = {index[k] for k in ranked[:n_keep]}
+
+        # Se reconstruye cada documento respetando el orden del re-ranking y de lectura
+        compressed = []
+        for i, d in enumerate(docs):
+            sents = [s for j, s in enumerate(split_docs[i]) if (i, j) in kept]
+            if sents:
+                compressed.append(Document(page_content="\n".join(sents), metadata=dict(d.metadata)))
+        return compressed
 
-    def _log(self, q, a, docs):
+    def _log(self, q, a, docs, metrics=None):
         """Almacena la traza de la consulta para análisis de fidelidad."""
         entry = {
             "timestamp": datetime.now().isoformat(), 
             "question": q, 
             "answer": a, 
-            "contexts": [d.page_content for d in docs]
+            "contexts": [d.page_content for d in docs],
+            "metrics": metrics
         }
         with open(Config.LOG_PATH, "a", encoding="utf-8") as f:
             f.write(json.dumps(entry, ensure_ascii=False) + "\n")
\ No newline at end of file